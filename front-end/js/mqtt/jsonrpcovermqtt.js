@@ -103,7 +103,12 @@ class JsonRpcService {
 
   receiveMessage(topic, message) {
     //console.log("Got Message", topic, this.connected_uri);
-    message = JSON.parse(message.toString());
+    try {
+      message = JSON.parse(message.toString());
+    } catch (e) {
+      // e.g. binary joint frames from `leader.py --binary`, meant for the follower only
+      return;
+    }
 
     if (message.length !== undefined) {
       for (var i = 0; i < message.length; ++i) {
@@ -843,20 +843,23 @@ class SerialMotorsBus(MotorsBusBase):
         normalized_values = {}
         for id_, val in ids_values.items():
             motor = self._id_to_name(id_)
-            min_ = self.calibration[motor].range_min
-            max_ = self.calibration[motor].range_max
-            drive_mode = self.apply_drive_mode and self.calibration[motor].drive_mode
+            # Look each attribute up once: this runs for every motor on every read
+            calibration = self.calibration[motor]
+            min_ = calibration.range_min
+            max_ = calibration.range_max
+            drive_mode = self.apply_drive_mode and calibration.drive_mode
+            norm_mode = self.motors[motor].norm_mode
             if max_ == min_:
                 raise ValueError(f"Invalid calibration for motor '{motor}': min and max are equal.")
 
             bounded_val = min(max_, max(min_, val))
-            if self.motors[motor].norm_mode is MotorNormMode.RANGE_M100_100:
+            if norm_mode is MotorNormMode.RANGE_M100_100:
                 norm = (((bounded_val - min_) / (max_ - min_)) * 200) - 100
                 normalized_values[id_] = -norm if drive_mode else norm
-            elif self.motors[motor].norm_mode is MotorNormMode.RANGE_0_100:
+            elif norm_mode is MotorNormMode.RANGE_0_100:
                 norm = ((bounded_val - min_) / (max_ - min_)) * 100
                 normalized_values[id_] = 100 - norm if drive_mode else norm
-            elif self.motors[motor].norm_mode is MotorNormMode.DEGREES:
+            elif norm_mode is MotorNormMode.DEGREES:
                 mid = (min_ + max_) / 2
                 max_res = self.model_resolution_table[self._id_to_model(id_)] - 1
                 normalized_values[id_] = (val - mid) * 360 / max_res
@@ -872,21 +875,24 @@ class SerialMotorsBus(MotorsBusBase):
         unnormalized_values = {}
         for id_, val in ids_values.items():
             motor = self._id_to_name(id_)
-            min_ = self.calibration[motor].range_min
-            max_ = self.calibration[motor].range_max
-            drive_mode = self.apply_drive_mode and self.calibration[motor].drive_mode
+            # Look each attribute up once: this runs for every motor on every write
+            calibration = self.calibration[motor]
+            min_ = calibration.range_min
+            max_ = calibration.range_max
+            drive_mode = self.apply_drive_mode and calibration.drive_mode
+            norm_mode = self.motors[motor].norm_mode
             if max_ == min_:
                 raise ValueError(f"Invalid calibration for motor '{motor}': min and max are equal.")
 
-            if self.motors[motor].norm_mode is MotorNormMode.RANGE_M100_100:
+            if norm_mode is MotorNormMode.RANGE_M100_100:
                 val = -val if drive_mode else val
                 bounded_val = min(100.0, max(-100.0, val))
                 unnormalized_values[id_] = int(((bounded_val + 100) / 200) * (max_ - min_) + min_)
-            elif self.motors[motor].norm_mode is MotorNormMode.RANGE_0_100:
+            elif norm_mode is MotorNormMode.RANGE_0_100:
                 val = 100 - val if drive_mode else val
                 bounded_val = min(100.0, max(0.0, val))
                 unnormalized_values[id_] = int((bounded_val / 100) * (max_ - min_) + min_)
-            elif self.motors[motor].norm_mode is MotorNormMode.DEGREES:
+            elif norm_mode is MotorNormMode.DEGREES:
                 mid = (min_ + max_) / 2
                 max_res = self.model_resolution_table[self._id_to_model(id_)] - 1
                 unnormalized_values[id_] = int((val * max_res / 360) + mid)
@@ -1128,6 +1134,48 @@ class SerialMotorsBus(MotorsBusBase):
             dict[str, Value]: Mapping *motor name → value*.
         """
 
+        ids_values = self._sync_read_ids_values(data_name, motors, normalize=normalize, num_retry=num_retry)
+        return {self._id_to_name(id_): value for id_, value in ids_values.items()}
+
+    @check_if_not_connected
+    def sync_read_into(
+        self,
+        data_name: str,
+        out: dict[str, Value],
+        motors: str | list[str] | None = None,
+        *,
+        normalize: bool = True,
+        num_retry: int = 0,
+    ) -> dict[str, Value]:
+        """Same as :pymeth:`sync_read` but stores the values in a caller-owned dict.
+
+        Meant for loops reading the same register every tick (e.g. teleoperation), which can then reuse a
+        single result dict instead of allocating a new one per read.
+
+        Args:
+            data_name (str): Register name.
+            out (dict[str, Value]): Dict updated in place with *motor name → value*.
+            motors (str | list[str] | None, optional): Motors to query. `None` (default) reads every motor.
+            normalize (bool, optional): Normalisation flag.  Defaults to `True`.
+            num_retry (int, optional): Retry attempts.  Defaults to `0`.
+
+        Returns:
+            dict[str, Value]: `out`, for convenience.
+        """
+
+        ids_values = self._sync_read_ids_values(data_name, motors, normalize=normalize, num_retry=num_retry)
+        for id_, value in ids_values.items():
+            out[self._id_to_name(id_)] = value
+        return out
+
+    def _sync_read_ids_values(
+        self,
+        data_name: str,
+        motors: str | list[str] | None,
+        *,
+        normalize: bool,
+        num_retry: int,
+    ) -> dict[int, Value]:
         self._assert_protocol_is_compatible("sync_read")
 
         names = self._get_motors_list(motors)
@@ -1150,7 +1198,7 @@ class SerialMotorsBus(MotorsBusBase):
         if normalize and data_name in self.normalized_data:
             ids_values = self._normalize(ids_values)
 
-        return {self._id_to_name(id_): value for id_, value in ids_values.items()}
+        return ids_values
 
     def _sync_read(
         self,
@@ -28,30 +28,26 @@ from typing import Union, Any, TYPE_CHECKING
 
 import numpy as np
 
-# Optional imports for features not needed by basic MQTT control
-try:
+# Optional heavy dependencies (torch, accelerate, datasets) are imported lazily inside the functions that
+# need them: importing torch costs hundreds of ms and MB on a Raspberry Pi, and the MQTT control scripts
+# import this module (through the motors bus) without ever touching tensors.
+if TYPE_CHECKING:
     import torch
-except ImportError:
-    torch = None
+    from accelerate import Accelerator
 
-# Type aliases for when torch is available
-if TYPE_CHECKING and torch is not None:
     TorchDevice = torch.device
     TorchDtype = torch.dtype
 else:
     TorchDevice = Any
     TorchDtype = Any
 
-try:
-    from accelerate import Accelerator
-except ImportError:
-    Accelerator = None
 
-try:
-    from datasets.utils.logging import disable_progress_bar, enable_progress_bar
-except ImportError:
-    disable_progress_bar = None
-    enable_progress_bar = None
+def _import_torch(caller: str):
+    try:
+        import torch
+    except ImportError as e:
+        raise ImportError(f"torch is required for {caller}") from e
+    return torch
 
 
 def inside_slurm():
@@ -62,8 +58,7 @@ def inside_slurm():
 
 def auto_select_torch_device() -> TorchDevice:
     """Tries to select automatically a torch device."""
-    if torch is None:
-        raise ImportError("torch is required for auto_select_torch_device")
+    torch = _import_torch("auto_select_torch_device")
     if torch.cuda.is_available():
         logging.info("Cuda backend detected, using cuda.")
         return torch.device("cuda")
@@ -81,8 +76,7 @@ def auto_select_torch_device() -> TorchDevice:
 # TODO(Steven): Remove log. log shouldn't be an argument, this should be handled by the logger level
 def get_safe_torch_device(try_device: str, log: bool = False) -> TorchDevice:
     """Given a string, return a torch.device with checks on whether the device is available."""
-    if torch is None:
-        raise ImportError("torch is required for get_safe_torch_device")
+    torch = _import_torch("get_safe_torch_device")
     try_device = str(try_device)
     if try_device.startswith("cuda"):
         assert torch.cuda.is_available()
@@ -108,8 +102,7 @@ def get_safe_dtype(dtype: TorchDtype, device: Union[str, TorchDevice]):
     """
     mps is currently not compatible with float64
     """
-    if torch is None:
-        raise ImportError("torch is required for get_safe_dtype")
+    torch = _import_torch("get_safe_dtype")
     if isinstance(device, torch.device):
         device = device.type
     if device == "mps" and dtype == torch.float64:
@@ -134,6 +127,7 @@ def get_safe_dtype(dtype: TorchDtype, device: Union[str, TorchDevice]):
 
 
 def is_torch_device_available(try_device: str) -> bool:
+    torch = _import_torch("is_torch_device_available")
     try_device = str(try_device)  # Ensure try_device is a string
     if try_device.startswith("cuda"):
         return torch.cuda.is_available()
@@ -161,7 +155,7 @@ def init_logging(
     display_pid: bool = False,
     console_level: str = "INFO",
     file_level: str = "DEBUG",
-    accelerator: Union[Accelerator, None] = None,
+    accelerator: Union["Accelerator", None] = None,
 ):
     """Initialize logging configuration for LeRobot.
 
@@ -326,9 +320,13 @@ class SuppressProgressBars:
     """
 
     def __enter__(self):
+        from datasets.utils.logging import disable_progress_bar
+
         disable_progress_bar()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        from datasets.utils.logging import enable_progress_bar
+
         enable_progress_bar()
 
 
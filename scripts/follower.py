@@ -4,27 +4,34 @@ MQTT-controlled SO-ARM101 Follower with Jump Protection
 Run this on the Raspberry Pi connected to the follower arm
 """
 
-import json
 import logging
 import argparse
+import math
+import selectors
 import time
-import sys
-from pathlib import Path
+import socket
 import threading
 from datetime import datetime
 
+import numpy as np
 import paho.mqtt.client as mqtt  # type: ignore[import-not-found]
 
-# Add parent directory to path to import lerobot
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from lerobot.robots.so_follower import SO101Follower, SO101FollowerConfig
+from scripts.mqtt_common import (
+    BINARY_JOINTS_TAG,
+    UNIX_SOCKET_PREFIX,
+    create_mqtt_client,
+    is_tcp_socket,
+    json_dumps,
+    json_loads,
+)
 
 # Basic Logging set up
 logging.basicConfig(level=logging.INFO,
                     format= "%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+
 class Follower:
     """
     SO-ARM101 Follower controlled via MQTT messages from leader.py
@@ -52,6 +59,21 @@ class Follower:
         )
         self.follower = SO101Follower(follower_config)
         self.max_relative_target = max_relative_target
+
+        # Fixed joint order and preallocated buffers for the vectorised safety clamp
+        self._joint_names = tuple(self.follower.bus.motors)
+        self._goal_buf = np.empty(len(self._joint_names), dtype=np.float64)
+        self._present_buf = np.empty_like(self._goal_buf)
+        self._safe_buf = np.empty_like(self._goal_buf)
+        # "<joint>.pos" keys in joint order, so incoming commands don't need per-key suffix parsing
+        self._joint_keys = tuple(f"{name}.pos" for name in self._joint_names)
+        # Latest leader command in joint order (written by _on_message); NaN = joint not commanded yet
+        self._command_buf = np.full(len(self._joint_names), np.nan)
+        # A message is parsed here first and only copied into _command_buf if every value is valid
+        self._command_scratch = np.empty_like(self._command_buf)
+        self._has_command = False
+        # Refilled in place (under _bus_lock) by every control tick
+        self._present_pos = dict.fromkeys(self._joint_names, 0.0)
         self.control_fps = max(1, int(control_fps))
 
         # MQTT config
@@ -63,15 +85,22 @@ class Follower:
 
         self._mqtt_client: mqtt.Client | None = None
         self._mqtt_connected = threading.Event()
+        # Readiness selector (epoll on Linux) for the current broker socket, rebuilt on reconnect
+        self._mqtt_selector: selectors.BaseSelector | None = None
+        self._mqtt_selector_sock = None
+        self._next_reconnect_time = 0.0
+        # Broker socket to re-arm TCP_QUICKACK on, or None when it doesn't apply (set per connection)
+        self._quickack_sock = None
 
         self.is_running = False
 
         self.last_send_time = 0.0
 
-        self.goal_pos = {}
         self._goal_pos_lock = threading.Lock()
         self._last_cmd_timestamp: datetime | None = None
         self._bus_lock = threading.Lock()
+        # perf_counter() time of the last successful control-tick read into _present_pos, reused for feedback
+        self._last_present_time: float | None = None
 
     def _publish_actual_joint_angles(self, present_pos: dict) -> None:
         if not self._mqtt_client or not self._mqtt_connected.is_set():
@@ -82,7 +111,17 @@ class Follower:
             "params": {"joints": {f"{k}.pos": v for k, v in present_pos.items()}},
             "timestamp": time.time(),
         }
-        self._mqtt_client.publish(self.mqtt_topic+"/follower", json.dumps(message), retain=True)
+        self._mqtt_client.publish(self.mqtt_topic+"/follower", json_dumps(message), qos=0, retain=True)
+
+    def _set_quickack(self) -> None:
+        # ACK leader commands immediately instead of waiting on delayed-ACK (Linux TCP only)
+        sock = self._quickack_sock
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+        except OSError:
+            pass
 
     def _on_connect(self, client, userdata, flags, rc):
         if rc == 0:
@@ -92,7 +131,12 @@ class Follower:
                 self.mqtt_broker_port,
             )
             self._mqtt_connected.set()
-            client.subscribe(self.mqtt_topic+"/leader")
+            # Decide once per connection: quick-ACK only exists for TCP (not "unix:" brokers)
+            sock = client.socket()
+            self._quickack_sock = sock if hasattr(socket, "TCP_QUICKACK") and is_tcp_socket(sock) else None
+            self._set_quickack()
+            # QoS 0 matches the leader: a stale command is worthless once a newer one exists
+            client.subscribe(self.mqtt_topic+"/leader", qos=0)
             logger.info("Subscribed to topic: %s", self.mqtt_topic+"/leader")
         else:
             logger.error("Failed to connect to MQTT broker. Return code: %s", rc)
@@ -100,15 +144,38 @@ class Follower:
 
     def _on_disconnect(self, client, userdata, rc):
         self._mqtt_connected.clear()
+        self._quickack_sock = None
         logger.warning("Disconnected from MQTT broker. Return code: %s", rc)
 
     def _on_message(self, client, userdata, msg):
+        # Linux clears TCP_QUICKACK after each recv, so re-arm it for the next command
+        self._set_quickack()
+        # paho re-raises callback exceptions out of loop_read(), which would end the follower loop
+        # while set_joints keeps driving the arm to a goal that can no longer be updated
+        try:
+            self._handle_message(msg)
+        except Exception:
+            logger.exception("Error handling MQTT message on %s", msg.topic)
+
+    def _handle_message(self, msg):
+        if msg.payload[:1] == BINARY_JOINTS_TAG:
+            self._set_goal_position_binary(msg.payload)
+            return
+
         try:
-            payload = json.loads(msg.payload.decode("utf-8"))
+            payload = json_loads(msg.payload)
         except Exception:
             logger.warning("Invalid MQTT JSON payload on %s", msg.topic)
             return
 
+        # JSON-RPC batch from a batching leader: older samples are stale, only act on the freshest
+        if isinstance(payload, list):
+            if not payload:
+                return
+            payload = payload[-1]
+        if not isinstance(payload, dict):
+            return
+
         method = payload.get("method")
         if method != "set_follower_joint_angles":
             return
@@ -121,9 +188,15 @@ class Follower:
             cmd_ts = None
 
         with self._goal_pos_lock:
-            if cmd_ts is not None and self._last_cmd_timestamp is not None and cmd_ts <= self._last_cmd_timestamp:
+            if cmd_ts is not None and self._last_cmd_timestamp is not None:
+                try:
+                    if cmd_ts <= self._last_cmd_timestamp:
+                        return
+                except TypeError:
+                    # Naive vs timezone-aware timestamps can't be ordered; accept the newer message
+                    pass
+            if not self.set_goal_position(payload):
                 return
-            self.set_goal_position(payload)
             if cmd_ts is not None:
                 self._last_cmd_timestamp = cmd_ts
 
@@ -135,7 +208,7 @@ class Follower:
             logger.info("Follower arm connected")
 
             # Connect to MQTT broker
-            self._mqtt_client = mqtt.Client()
+            self._mqtt_client = create_mqtt_client(self.mqtt_broker_ip)
             self._mqtt_client.on_connect = self._on_connect
             self._mqtt_client.on_disconnect = self._on_disconnect
             self._mqtt_client.on_message = self._on_message
@@ -146,9 +219,11 @@ class Follower:
                 self.mqtt_broker_port,
             )
             self._mqtt_client.connect(self.mqtt_broker_ip, self.mqtt_broker_port, keepalive=60)
-            self._mqtt_client.loop_start()
 
-            if not self._mqtt_connected.wait(timeout=5):
+            deadline = time.monotonic() + 5
+            while not self._mqtt_connected.is_set() and time.monotonic() < deadline:
+                self._service_mqtt(timeout=0.1)
+            if not self._mqtt_connected.is_set():
                 logger.error("Failed to connect to MQTT broker within timeout")
                 return
 
@@ -178,55 +253,174 @@ class Follower:
 
                 # Periodic publish (keepalive) for frontend display
                 if self.follower_feedback and (now - self.last_send_time) >= self.idle_send_interval:
-                    try:
-                        with self._bus_lock:
-                            present_pos = self.follower.bus.sync_read("Present_Position")
-                    except Exception as e:
-                        logger.error("Failed to sync read 'Present_Position': %s", e)
-                        present_pos = None
+                    present_pos = self._get_recent_present_pos(now)
                     if present_pos is not None:
                         try:
                             self._publish_actual_joint_angles(present_pos)
                         except Exception as e:
                             logger.warning("Failed to publish present_pos over MQTT: %s", e)
-                        self.last_send_time = now
-
-                time.sleep(0.01)
+                    # Advance even if the read failed, so a bus error backs off for an interval
+                    # instead of being retried straight away
+                    self.last_send_time = now
+
+                # Sleep until broker data arrives or the next feedback publish is due (capped so
+                # stop_event is still checked regularly, floored so the loop never busy-spins)
+                timeout = 0.1
+                if self.follower_feedback:
+                    timeout = min(timeout, self.last_send_time + self.idle_send_interval - time.perf_counter())
+                self._service_mqtt(timeout=max(0.01, timeout))
         except Exception as e:
             logger.exception("Error in follower loop: %s", e)
         finally:
             try:
                 if self._mqtt_client is not None:
-                    self._mqtt_client.loop_stop()
                     self._mqtt_client.disconnect()
             except Exception:
                 pass
+            if self._mqtt_selector is not None:
+                self._mqtt_selector.close()
+
+    def _service_mqtt(self, timeout: float) -> None:
+        """
+        Run paho's network handling on this thread instead of loop_start()/loop_forever():
+        block on socket readiness for up to `timeout`, then read, flush and do keepalive.
+        Incoming commands are handled as soon as they arrive rather than on paho's select cadence.
+        """
+        client = self._mqtt_client
+        sock = client.socket()
+        if sock is None:
+            # Connection lost: paho only reconnects by itself from its own thread, so retry here
+            now = time.monotonic()
+            if now >= self._next_reconnect_time:
+                self._next_reconnect_time = now + 1.0
+                try:
+                    client.reconnect()
+                except OSError as e:
+                    logger.debug("MQTT reconnect failed: %s", e)
+            if client.socket() is None:
+                time.sleep(timeout)
+            return
 
-    def set_goal_position(self, payload):
-        # Extract joint angles from payload
-        joints = payload.get("params", {}).get("joints", {})
-
-        # Extract leader arm positions (remove .pos suffix)
-        self.goal_pos = {key.removesuffix(".pos"): val for key, val in joints.items() if key.endswith(".pos")}
+        if sock is not self._mqtt_selector_sock:
+            if self._mqtt_selector is not None:
+                self._mqtt_selector.close()
+            self._mqtt_selector = selectors.DefaultSelector()
+            self._mqtt_selector.register(sock, selectors.EVENT_READ)
+            self._mqtt_selector_sock = sock
+
+        if self._mqtt_selector.select(timeout):
+            client.loop_read()
+        if client.want_write():
+            client.loop_write()
+        client.loop_misc()
+
+    def _get_recent_present_pos(self, now: float) -> dict | None:
+        # Reuse the positions read by the control loop if fresh, saving a bus transaction
+        try:
+            with self._bus_lock:
+                last_present_time = self._last_present_time
+                if last_present_time is not None and (now - last_present_time) < self.idle_send_interval:
+                    # Copy under the lock the control tick refills _present_pos with, once per publish
+                    return dict(self._present_pos)
+                return self.follower.bus.sync_read("Present_Position")
+        except Exception as e:
+            logger.error("Failed to sync read 'Present_Position': %s", e)
+            return None
+
+    def _safe_goal_position(self, present_pos: dict) -> dict:
+        """
+        Turn the goal buffer into the Goal_Position write for this tick, capping each joint's move to
+        max_relative_target in one vector op over all joints. Joints never commanded (NaN) are skipped.
+        """
+        goal, present, safe = self._goal_buf, self._present_buf, self._safe_buf
+        if self.max_relative_target is None:
+            np.copyto(safe, goal)
+        else:
+            for i, name in enumerate(self._joint_names):
+                present[i] = present_pos[name]
+
+            np.subtract(goal, present, out=safe)
+            np.clip(safe, -self.max_relative_target, self.max_relative_target, out=safe)
+            np.add(present, safe, out=safe)
+
+            clamped = np.abs(safe - goal) > 1e-4
+            if clamped.any():
+                logger.warning(
+                    "Relative goal position magnitude had to be clamped to be safe: %s",
+                    [name for name, c in zip(self._joint_names, clamped) if c],
+                )
+
+        return {name: val for name, val in zip(self._joint_names, safe.tolist()) if not math.isnan(val)}
+
+    def set_goal_position(self, payload) -> bool:
+        """
+        Apply the joint angles of a set_follower_joint_angles message to the command buffer (joint
+        order). Joints missing from the message keep their previous goal. The message is applied
+        all-or-nothing: returns False, leaving the buffer untouched, if any value is invalid.
+        Must be called with _goal_pos_lock held.
+        """
+        params = payload.get("params")
+        joints = params.get("joints") if isinstance(params, dict) else None
+        if not isinstance(joints, dict):
+            logger.warning("Invalid joint command, expected params.joints object: %s", payload)
+            return False
+
+        scratch = self._command_scratch
+        np.copyto(scratch, self._command_buf)
+        for i, key in enumerate(self._joint_keys):
+            val = joints.get(key)
+            if val is None:
+                continue
+            # bool is an int subclass, and numeric strings would be coerced by numpy: reject both
+            valid = isinstance(val, (int, float)) and not isinstance(val, bool)
+            try:
+                valid = valid and math.isfinite(val)
+            except OverflowError:  # integer too large for a float
+                valid = False
+            if not valid:
+                logger.warning("Invalid value for %s in joint command: %r", key, val)
+                return False
+            scratch[i] = val
+
+        np.copyto(self._command_buf, scratch)
+        self._has_command = True
+        return True
+
+    def _set_goal_position_binary(self, data: bytes) -> None:
+        if len(data) != len(BINARY_JOINTS_TAG) + 2 * len(self._joint_names):
+            logger.warning("Invalid binary joint frame (%d bytes)", len(data))
+            return
+        centidegrees = np.frombuffer(data, dtype="<i2", offset=len(BINARY_JOINTS_TAG))
+        # Binary frames carry no timestamp; the broker connection already preserves ordering
+        with self._goal_pos_lock:
+            np.divide(centidegrees, 100, out=self._command_buf)
+            self._has_command = True
 
     def set_joints(self, stop_event=None):
         loop_time = 1.0 / float(self.control_fps)
         while stop_event is None or not stop_event.is_set():
             loop_start = time.perf_counter()
             with self._goal_pos_lock:
-                goal_pos = dict(self.goal_pos)
+                has_command = self._has_command
+                if has_command:
+                    np.copyto(self._goal_buf, self._command_buf)
 
-            if not goal_pos:
+            if not has_command:
                 time.sleep(min(0.05, loop_time))
                 continue
 
-            action = {f"{motor}.pos": val for motor, val in goal_pos.items()}
             try:
+                # One read and one write per tick: the clamp needs present positions, so the
+                # write can't be issued before the read returns.
                 with self._bus_lock:
-                    self.follower.send_action(action)
+                    present_pos = self.follower.bus.sync_read_into("Present_Position", self._present_pos)
+                    self._last_present_time = time.perf_counter()
+                    goal_pos = self._safe_goal_position(present_pos)
+                    if goal_pos:
+                        self.follower.bus.sync_write("Goal_Position", goal_pos)
             except Exception as e:
                 # Don't crash the thread if the bus glitches; just back off and retry.
-                logger.warning("send_action failed (will retry): %s", e)
+                logger.warning("Goal position write failed (will retry): %s", e)
                 time.sleep(0.1)
 
             # Sleep to maintain control rate.
@@ -268,6 +462,13 @@ class CameraStreamer:
                 'sync=false', 'async=false'
         ]
 
+        def wait_before_restart(seconds):
+            # Unlike time.sleep, returns as soon as shutdown is requested
+            if stop_event is not None:
+                stop_event.wait(seconds)
+            else:
+                time.sleep(seconds)
+
         # Loop to continuously run the GStreamer pipeline, restarting if it crashes, until stop_event is set
         while stop_event is None or not stop_event.is_set():
             t = time.localtime()
@@ -281,22 +482,24 @@ class CameraStreamer:
                         proc.terminate()
                         proc.wait()
                         return
-                    ret = proc.poll()
-                    if ret is not None:
-                        logger.warning(f"Camera pipeline exited with code {ret}. Restarting in 2s...")
-                        proc.wait()
-                        time.sleep(2)
-                        break
-                    time.sleep(0.2)
+                    # Block on the process itself so an early exit (e.g. bad device) is seen immediately
+                    try:
+                        ret = proc.wait(timeout=0.2)
+                    except subprocess.TimeoutExpired:
+                        continue
+                    logger.warning(f"Camera pipeline exited with code {ret}. Restarting in 2s...")
+                    wait_before_restart(2)
+                    break
             except Exception as e:
                 logger.error(f"Error starting GStreamer pipeline: {e}. Retrying in 2s...")
-                time.sleep(2)
+                wait_before_restart(2)
 
 def parse_args():
     p = argparse.ArgumentParser(description="SO-ARM101 follower")
     p.add_argument("--follower-port", default="/dev/ttyACM0")
     p.add_argument("--follower-id", default="so_follower")
-    p.add_argument("--mqtt-broker-ip", default="192.168.1.107")
+    p.add_argument("--mqtt-broker-ip", default="192.168.1.107",
+                   help="MQTT broker address, or unix:/path/to/mqtt.sock for a broker on this machine")
     p.add_argument("--mqtt-broker-port", type=int, default=1883)
     p.add_argument("--mqtt-topic", default="watchman_robotarm/so-101")
     p.add_argument("--max-relative-target", type=float, default=20.0)
@@ -315,6 +518,10 @@ def parse_args():
 def main():
     args = parse_args()
 
+    if args.camera_device and not args.video_host and args.mqtt_broker_ip.startswith(UNIX_SOCKET_PREFIX):
+        logger.error("--video-host is required with --camera when the MQTT broker is a Unix socket")
+        return
+
     follower = Follower(
         follower_port=args.follower_port,
         follower_id=args.follower_id,
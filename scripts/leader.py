@@ -5,24 +5,47 @@ Run this on the PC connected to the leader arm
 """
 
 import argparse
-import json
+import errno
 import logging
-import sys
+import math
+import os
+import socket
+import struct
 import time
-import uuid
 from datetime import datetime, timezone
-from pathlib import Path
-
-# Add parent directory to path to import lerobot
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import paho.mqtt.client as mqtt
 from lerobot.teleoperators.so_leader import SO101Leader, SO101LeaderConfig
+from scripts.mqtt_common import BINARY_JOINTS_TAG, create_mqtt_client, is_tcp_socket, json_dumps
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Fixed-width fields of the preformatted JSON-RPC payload (see LeaderMQTTSender._build_payload_template).
+# Joint values are right-aligned in spaces, which JSON allows around numbers.
+MESSAGE_ID_WIDTH = 10  # zero-padded counter, sent as a string like the old uuid4 ids
+TIMESTAMP_WIDTH = 32  # datetime.isoformat(timespec="microseconds") in UTC
+JOINT_VALUE_FORMAT = b"%10.4f"
+JOINT_VALUE_WIDTH = 10
+
+# Longest the control loop may stall finishing a partially written PUBLISH frame before giving up
+# on the connection (a half-sent frame can't be abandoned without corrupting the MQTT stream)
+PARTIAL_SEND_TIMEOUT = 0.1
+
+
+def _encode_remaining_length(length: int) -> bytes:
+    """Encode an MQTT fixed-header 'remaining length' (7 bits per byte, MSB = continuation)"""
+    out = bytearray()
+    while True:
+        length, byte = divmod(length, 128)
+        if length:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
 class LeaderMQTTSender:
     """
     Reads positions from leader arm and sends them via MQTT to front-end and follower.py.
@@ -38,16 +61,24 @@ class LeaderMQTTSender:
         mqtt_topic: str = "watchman_robotarm/so-101",
         fps: int = 24,
         idle_send_interval: float = 0.25,
+        batch_size: int = 1,
+        binary: bool = False,
+        pin_cpus: list[int] | None = None,
+        realtime_priority: int | None = None,
     ):
         """
         Args:
             leader_port: Serial port for leader arm (e.g., "/dev/ttyACM0")
             leader_id: ID for calibration file (e.g., "so_leader")
-            mqtt_broker: MQTT broker address (e.g., "0.0.0.0")
+            mqtt_broker: MQTT broker address (e.g., "0.0.0.0"), or "unix:/path" for a local Unix socket
             mqtt_port: MQTT broker port (default: 1883)
             mqtt_topic: MQTT topic to publish targets to
             fps: Target control loop frequency (default: 24)
             idle_send_interval: Send a keepalive target if no change for this many seconds (default: 0.25)
+            batch_size: Number of leader samples to pack into one JSON-RPC batch publish (default: 1, no batching)
+            binary: Send compact binary joint frames instead of JSON-RPC (follower only, no frontend display)
+            pin_cpus: CPU cores to pin the sender to, e.g. [2] (default: None, no pinning)
+            realtime_priority: Run the sender under SCHED_FIFO with this priority, 1-99 (default: None)
         """
         # Initialize leader
         leader_config = SO101LeaderConfig(
@@ -58,22 +89,42 @@ class LeaderMQTTSender:
         self.leader = SO101Leader(leader_config)
         
         # Initialize MQTT
-        self.mqtt_client = mqtt.Client()
+        self.mqtt_client = create_mqtt_client(mqtt_broker)
         self.mqtt_client.on_connect = self._on_connect
         self.mqtt_client.on_disconnect = self._on_disconnect
         self.mqtt_broker = mqtt_broker
         self.mqtt_port = mqtt_port
         self.mqtt_topic = mqtt_topic+"/leader"
+        # Constant part of our PUBLISH frames: length-prefixed topic name (QoS 0 has no packet id)
+        topic_bytes = self.mqtt_topic.encode("utf-8")
+        self._publish_topic_field = struct.pack("!H", len(topic_bytes)) + topic_bytes
         
         self.fps = fps
         self.idle_send_interval = max(0.0, float(idle_send_interval))
+        self.batch_size = max(1, int(batch_size))
+        self.binary = binary
+        self.pin_cpus = set(pin_cpus) if pin_cpus else None
+        self.realtime_priority = realtime_priority
+        self._joint_keys = tuple(f"{motor}.pos" for motor in self.leader.bus.motors)
+        self._binary_joints = struct.Struct(f"<{len(self._joint_keys)}h")
+        self._pending_messages = []
+        self._message_counter = 0
+        self._build_payload_template()
         self.is_running = False
         self.is_connected = False
+        self._next_reconnect_time = 0.0
         
     def _on_connect(self, client, userdata, flags, rc):
         """Called when MQTT connection is established"""
         if rc == 0:
             logger.info(f"Connected to MQTT broker at {self.mqtt_broker}:{self.mqtt_port}")
+            # Disable Nagle so small back-to-back publishes are not held back waiting for ACKs
+            sock = client.socket()
+            if is_tcp_socket(sock):
+                try:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                except OSError as e:
+                    logger.debug(f"Could not set TCP_NODELAY on MQTT socket: {e}")
             self.is_connected = True
         else:
             logger.error(f"Failed to connect to MQTT broker. Return code: {rc}")
@@ -86,9 +137,184 @@ class LeaderMQTTSender:
         if rc != 0:
             logger.info("Attempting to reconnect...")
     
+    def _next_message_id(self) -> str:
+        """Monotonic JSON-RPC id, much cheaper than a uuid4 per frame"""
+        self._message_counter = (self._message_counter + 1) % 10**MESSAGE_ID_WIDTH
+        return f"{self._message_counter:0{MESSAGE_ID_WIDTH}d}"
+
+    def _build_payload_template(self):
+        """
+        Preformat the complete PUBLISH frame for a single-sample JSON-RPC message once (fixed header,
+        remaining length, topic and payload), recording where the id, timestamp and each joint value
+        live, so every send only overwrites those bytes in place and writes the buffer as is.
+        """
+        template = bytearray(b'{"id":"')
+        self._id_offset = len(template)
+        template += b"0" * MESSAGE_ID_WIDTH
+        template += b'","method":"set_follower_joint_angles","timestamp":"'
+        self._timestamp_offset = len(template)
+        template += b"0" * TIMESTAMP_WIDTH
+        template += b'","params":{"joints":{'
+        self._joint_offsets = []
+        for i, key in enumerate(self._joint_keys):
+            if i:
+                template += b","
+            template += json_dumps(key) + b":"
+            self._joint_offsets.append(len(template))
+            template += JOINT_VALUE_FORMAT % 0.0
+        template += b"}}}"
+
+        # Every field is fixed width, so the frame length (and its varint) never changes
+        header = self._publish_header(len(template))
+        self._id_offset += len(header)
+        self._timestamp_offset += len(header)
+        self._joint_offsets = [offset + len(header) for offset in self._joint_offsets]
+        self._template_payload_offset = len(header)
+        self._template_frame = bytearray(header) + template
+
+    def _fill_payload_template(self, action: dict) -> bool:
+        """Patch the template frame with this action. Returns False if it doesn't fit (caller falls back to json_dumps)"""
+        if len(action) != len(self._joint_keys):
+            return False
+        buf = self._template_frame
+        for key, offset in zip(self._joint_keys, self._joint_offsets):
+            value = action.get(key)
+            # "%f" renders NaN/inf as padded "nan"/"inf", which fits the field but isn't valid JSON
+            if value is None or not math.isfinite(value):
+                return False
+            text = JOINT_VALUE_FORMAT % value
+            if len(text) != JOINT_VALUE_WIDTH:
+                return False
+            buf[offset:offset + JOINT_VALUE_WIDTH] = text
+        buf[self._id_offset:self._id_offset + MESSAGE_ID_WIDTH] = self._next_message_id().encode()
+        timestamp = datetime.now(timezone.utc).isoformat(timespec="microseconds").encode()
+        buf[self._timestamp_offset:self._timestamp_offset + TIMESTAMP_WIDTH] = timestamp
+        return True
+
+    def _encode_binary(self, action: dict) -> bytes:
+        """Pack an action as BINARY_JOINTS_TAG + int16 centidegrees per joint"""
+        return BINARY_JOINTS_TAG + self._binary_joints.pack(*(round(action[key] * 100) for key in self._joint_keys))
+
+    def _publish_pending(self):
+        """Publish queued messages, as a JSON-RPC batch (array) when there is more than one"""
+        if len(self._pending_messages) == 1:
+            payload = json_dumps(self._pending_messages[0])
+        else:
+            payload = json_dumps(self._pending_messages)
+        self._pending_messages.clear()
+        self._publish_frame(payload)
+
+    def _publish_header(self, payload_length: int) -> bytes:
+        """Fixed header + topic field of a QoS 0 retained PUBLISH carrying payload_length bytes"""
+        return (
+            b"\x31"  # PUBLISH, QoS 0, retain
+            + _encode_remaining_length(len(self._publish_topic_field) + payload_length)
+            + self._publish_topic_field
+        )
+
+    def _publish_frame(self, payload: bytes | bytearray):
+        """Publish a variable-length payload (batches, binary frames) as a QoS 0 retained message"""
+        header = self._publish_header(len(payload))
+        self._send_frame(header + payload, len(header))
+
+    def _publish_template_frame(self):
+        """Publish the template frame as filled in by _fill_payload_template"""
+        self._send_frame(self._template_frame, self._template_payload_offset)
+
+    def _send_frame(self, frame: bytes | bytearray, payload_offset: int):
+        """
+        Write a complete QoS 0 retained PUBLISH frame straight to the broker socket.
+
+        This skips paho's per-publish packet building and its queue, which is only safe
+        because publishing and paho's network loop share this thread (see _service_mqtt).
+        payload_offset is where the message payload starts, for handing it to paho instead.
+        """
+        # QoS 0: positions are idempotent and the next frame supersedes a lost one,
+        # so skip the broker ACK round-trip. Retained so the frontend gets the last pose.
+        sock = self.mqtt_client._sock
+        if sock is None or not self.is_connected or self.mqtt_client._out_packet:
+            # No session yet, or paho has its own bytes queued: let paho keep the stream ordered
+            self.mqtt_client.publish(self.mqtt_topic, bytes(frame[payload_offset:]), qos=0, retain=True)
+            return
+
+        try:
+            sent = sock.send(frame)
+        except BlockingIOError:
+            # Nothing was written, so paho can still queue the whole message
+            self.mqtt_client.publish(self.mqtt_topic, bytes(frame[payload_offset:]), qos=0, retain=True)
+            return
+        except OSError as e:
+            # Connection is going away; the next _service_mqtt() notices and reconnects
+            logger.debug(f"MQTT socket send failed: {e}")
+            return
+        if sent < len(frame):
+            # Never leave half a frame on the wire: wait (briefly) for the rest to go out
+            sock.settimeout(PARTIAL_SEND_TIMEOUT)
+            try:
+                sock.sendall(memoryview(frame)[sent:])
+            except OSError as e:
+                # Broker stalled or connection failed mid-frame, so the stream can't be resumed.
+                # Shut the socket down; paho sees the closed connection on its next read and
+                # _service_mqtt() reconnects.
+                logger.warning(f"MQTT socket send stalled, dropping connection: {e}")
+                self.is_connected = False
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            finally:
+                sock.setblocking(False)
+
+    def _service_mqtt(self, timeout: float = 0.0):
+        """Run paho's network loop (read, write, keepalive) inline instead of on a background thread"""
+        rc = self.mqtt_client.loop(timeout=timeout)
+        if rc == mqtt.MQTT_ERR_SUCCESS or self.is_connected:
+            return
+
+        # Without loop_start() paho doesn't reconnect on its own, so retry at most once a second
+        now = time.monotonic()
+        if now < self._next_reconnect_time:
+            return
+        self._next_reconnect_time = now + 1.0
+        try:
+            self.mqtt_client.reconnect()
+        except OSError as e:
+            logger.debug(f"MQTT reconnect failed: {e}")
+
+    def _pin_to_cpus(self):
+        """Keep the control loop (and the inline MQTT I/O) on fixed cores for stable caches and wakeups"""
+        if not hasattr(os, "sched_setaffinity"):
+            logger.warning("CPU pinning is not supported on this platform, ignoring --pin-cpus")
+            return
+        try:
+            os.sched_setaffinity(0, self.pin_cpus)
+            logger.info(f"Pinned leader sender to CPU(s) {sorted(self.pin_cpus)}")
+        except (OSError, ValueError) as e:
+            # ValueError for CPU numbers sched_setaffinity can't represent (e.g. negative)
+            logger.warning(f"Failed to pin leader sender to CPU(s) {sorted(self.pin_cpus)}: {e}")
+
+    def _set_realtime_priority(self):
+        """Use SCHED_FIFO so the loop's wakeups aren't delayed by ordinary time-shared processes"""
+        if not hasattr(os, "sched_setscheduler"):
+            logger.warning("SCHED_FIFO is not supported on this platform, ignoring --realtime-priority")
+            return
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.realtime_priority))
+            logger.info(f"Leader sender running with SCHED_FIFO priority {self.realtime_priority}")
+        except OSError as e:
+            if e.errno == errno.EPERM:
+                logger.warning(f"Failed to set SCHED_FIFO (needs root or CAP_SYS_NICE): {e}")
+            else:
+                logger.warning(f"Failed to set SCHED_FIFO priority {self.realtime_priority}: {e}")
+
     def start(self):
         """Start reading from leader and sending via MQTT"""
         try:
+            if self.pin_cpus:
+                self._pin_to_cpus()
+            if self.realtime_priority is not None:
+                self._set_realtime_priority()
+
             # Connect to leader arm
             logger.info(f"Connecting to leader arm on {self.leader.config.port}...")
             self.leader.connect()
@@ -97,14 +323,11 @@ class LeaderMQTTSender:
             # Connect to MQTT broker
             logger.info(f"Connecting to MQTT broker at {self.mqtt_broker}:{self.mqtt_port}...")
             self.mqtt_client.connect(self.mqtt_broker, self.mqtt_port, keepalive=60)
-            self.mqtt_client.loop_start()
 
             # Wait for MQTT connection
-            timeout = 5
-            elapsed = 0
-            while not self.is_connected and elapsed < timeout:
-                time.sleep(0.1)
-                elapsed += 0.1
+            deadline = time.monotonic() + 5
+            while not self.is_connected and time.monotonic() < deadline:
+                self._service_mqtt(timeout=0.1)
 
             if not self.is_connected:
                 logger.error("Failed to connect to MQTT broker within timeout")
@@ -116,46 +339,68 @@ class LeaderMQTTSender:
             logger.info("Move the leader arm to control the follower")
 
             self.is_running = True
-            loop_time = 1.0 / self.fps
+            # Integer nanoseconds throughout: exact, so the deadline never accumulates rounding error
+            loop_ns = 1_000_000_000 // self.fps
+            idle_send_interval_ns = int(self.idle_send_interval * 1_000_000_000)
 
             last_action = None
-            last_send_time = 0.0
+            last_send_ns = 0
+            next_deadline_ns = time.perf_counter_ns()
 
             while self.is_running:
-                loop_start = time.perf_counter()
-
                 # Read leader position
                 action = self.leader.get_action()
 
                 # Throttle: only send if action changed, or 0.25s passed since last send
-                now = time.perf_counter()
+                now_ns = time.perf_counter_ns()
                 should_send = False
                 if last_action is None or action != last_action:
                     should_send = True
-                elif (now - last_send_time) >= self.idle_send_interval:
+                elif (now_ns - last_send_ns) >= idle_send_interval_ns:
                     should_send = True
 
-                if self.is_connected and should_send:
-                    # Format as JSON-RPC message
-                    message = {
-                        "id": str(uuid.uuid4()),
-                        "method": "set_follower_joint_angles",
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                        "params": {
-                            "joints": action
+                if self.is_connected and should_send and self.binary:
+                    try:
+                        self._publish_frame(self._encode_binary(action))
+                    except struct.error as e:
+                        logger.warning(f"Joint value out of binary range, skipping send: {e}")
+                    last_action = action.copy() if hasattr(action, 'copy') else dict(action)
+                    last_send_ns = now_ns
+                elif self.is_connected and should_send:
+                    if self.batch_size == 1 and self._fill_payload_template(action):
+                        self._publish_template_frame()
+                    else:
+                        # Format as JSON-RPC message
+                        message = {
+                            "id": self._next_message_id(),
+                            "method": "set_follower_joint_angles",
+                            "timestamp": datetime.now(timezone.utc).isoformat(),
+                            "params": {
+                                "joints": action
+                            }
                         }
-                    }
-                    payload = json.dumps(message)
-                    self.mqtt_client.publish(self.mqtt_topic, payload, retain=True)
+                        self._pending_messages.append(message)
+                        if len(self._pending_messages) >= self.batch_size:
+                            self._publish_pending()
                     last_action = action.copy() if hasattr(action, 'copy') else dict(action)
-                    last_send_time = now
+                    last_send_ns = now_ns
+                elif self.is_connected and self._pending_messages:
+                    # Arm stopped moving: flush a partial batch so the final pose isn't held back
+                    self._publish_pending()
                 elif not self.is_connected:
+                    self._pending_messages.clear()
                     logger.warning("Not connected to MQTT, skipping send")
 
-                # Sleep to maintain target FPS
-                elapsed = time.perf_counter() - loop_start
-                sleep_time = max(0, loop_time - elapsed)
-                time.sleep(sleep_time)
+                self._service_mqtt()
+
+                # Sleep until the next absolute deadline so timing errors don't accumulate
+                next_deadline_ns += loop_ns
+                delay_ns = next_deadline_ns - time.perf_counter_ns()
+                if delay_ns > 0:
+                    time.sleep(delay_ns / 1e9)
+                elif delay_ns < -loop_ns:
+                    # Fell more than a frame behind (e.g. bus stall): resync instead of bursting
+                    next_deadline_ns = time.perf_counter_ns()
 
         except KeyboardInterrupt:
             logger.info("\nKeyboard interrupt received")
@@ -169,7 +414,6 @@ class LeaderMQTTSender:
         if self.is_running:
             logger.info("Stopping leader sender...")
             self.is_running = False
-            self.mqtt_client.loop_stop()
             self.mqtt_client.disconnect()
             self.leader.disconnect()
             logger.info("Leader sender stopped")
@@ -179,12 +423,29 @@ def parse_args():
     p = argparse.ArgumentParser(description="SO-ARM101 leader sender (MQTT).")
     p.add_argument("--leader-port", default="/dev/ttyACM0")
     p.add_argument("--leader-id", default="so_leader")
-    p.add_argument("--mqtt-broker", default="0.0.0.0")
+    p.add_argument("--mqtt-broker", default="0.0.0.0",
+                   help="MQTT broker address, or unix:/path/to/mqtt.sock for a broker on this machine")
     p.add_argument("--mqtt-port", type=int, default=1883)
     p.add_argument("--mqtt-topic", default="watchman_robotarm/so-101")
     p.add_argument("--fps", type=int, default=24)
     p.add_argument("--idle-send-interval", type=float, default=0.25)
-    return p.parse_args()
+    p.add_argument("--batch", type=int, default=1,
+                   help="Pack this many leader samples into one MQTT publish (default: 1, no batching)")
+    p.add_argument("--binary", action="store_true",
+                   help="Send compact binary joint frames instead of JSON-RPC. The follower accepts both; "
+                        "the web frontend only understands JSON, so the leader twin won't update.")
+    p.add_argument("--pin-cpus", type=int, nargs="+", default=None,
+                   help="Pin the sender to these CPU cores, e.g. --pin-cpus 2 (Linux only; skip on single-core boards)")
+    p.add_argument("--realtime-priority", type=int, default=None,
+                   help="Run the sender under SCHED_FIFO with this priority, 1-99 (Linux, needs root or CAP_SYS_NICE)")
+    args = p.parse_args()
+    if args.binary and args.batch > 1:
+        p.error("--binary can't be combined with --batch")
+    if args.pin_cpus and min(args.pin_cpus) < 0:
+        p.error("--pin-cpus core numbers must be >= 0")
+    if args.realtime_priority is not None and not 1 <= args.realtime_priority <= 99:
+        p.error("--realtime-priority must be between 1 and 99")
+    return args
 
 
 def main():
@@ -199,6 +460,10 @@ def main():
         mqtt_topic=args.mqtt_topic,
         fps=args.fps,
         idle_send_interval=args.idle_send_interval,
+        batch_size=args.batch,
+        binary=args.binary,
+        pin_cpus=args.pin_cpus,
+        realtime_priority=args.realtime_priority,
     )
 
     sender.start()
@@ -0,0 +1,55 @@
+"""
+MQTT plumbing and wire format shared by leader.py and follower.py
+"""
+
+import json
+import socket
+
+import paho.mqtt.client as mqtt  # type: ignore[import-not-found]
+
+try:
+    import orjson
+
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    # orjson is optional; fall back to the stdlib (returns bytes like orjson, json.loads accepts bytes)
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    json_loads = json.loads
+
+# Compact leader wire format (leader.py --binary): tag byte + one little-endian int16 per joint in
+# centidegrees, in bus motor order. The tag can't start a JSON document, so receivers can tell the two apart.
+BINARY_JOINTS_TAG = b"\x00"
+
+UNIX_SOCKET_PREFIX = "unix:"
+
+
+class UnixSocketMQTTClient(mqtt.Client):
+    """
+    paho client that reaches the broker over a Unix domain socket instead of TCP,
+    e.g. a mosquitto `listener 0 /tmp/mqtt.sock` on the same machine.
+    """
+
+    def __init__(self, socket_path: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _create_socket_connection(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(getattr(self, "_connect_timeout", 5.0))
+        sock.connect(self.socket_path)
+        return sock
+
+
+def create_mqtt_client(broker: str) -> mqtt.Client:
+    """Return a Unix socket client for "unix:/path" brokers, a regular TCP client otherwise"""
+    if broker.startswith(UNIX_SOCKET_PREFIX):
+        return UnixSocketMQTTClient(broker[len(UNIX_SOCKET_PREFIX):])
+    return mqtt.Client()
+
+
+def is_tcp_socket(sock) -> bool:
+    """True for an IPv4/IPv6 socket, where TCP-level options like TCP_NODELAY apply"""
+    return sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6)